@@ -1,20 +1,97 @@
 import os
 import time
-import tempfile
-import glob
-import random
-import string
+import fnmatch
+import functools
+import heapq
+import itertools
+import operator
+import re
 import contextlib
+import errno
+import ctypes
 import fcntl
+import select
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Union, Optional, List, Iterator
+from typing import Union, Optional, Callable, List, Iterable, Iterator, TypeVar
 
 TUPLEDIR = Path(os.environ.get("LINDA_DIR", "/tmp/linda"))
 TUPLEDIR.mkdir(parents=True, exist_ok=True)
+_TUPLEDIR_STR = str(TUPLEDIR) + os.sep  # Prefix for building paths on hot paths
+_TUPLEDIR_BYTES = os.fsencode(TUPLEDIR)  # For ctypes calls
 
 # Constants
 once = -1  # Special timeout value for non-blocking operations
 LOCK_TIMEOUT = 5.0  # seconds
+POLL_INTERVAL = 0.1  # seconds between rescans when inotify is unavailable
+WATCH_RESCAN = 1.0  # seconds between rescans while waiting on inotify
+READ_CHUNK = 65536  # bytes per read() of a tuple file
+
+# In-process arrival notification for waiters without inotify: out() bumps
+# the count and notifies, so local producers wake them without a poll delay.
+# Only done while such a waiter is registered in _arrival_waiters
+_arrivals = threading.Condition()
+_arrival_count = 0
+_arrival_waiters = 0
+
+# O_TMPFILE + linkat publishing (Linux only; needs /proc to name the open inode)
+_use_tmpfile = hasattr(os, "O_TMPFILE") and os.path.isdir("/proc/self/fd")
+
+# inotify(7) support for blocking waits (Linux only; falls back to polling)
+_IN_CREATE = 0x00000100
+_IN_MOVED_TO = 0x00000080
+
+# libc, shared by the inotify and renameat2 bindings below (None makes
+# both fail over with AttributeError)
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+except OSError:
+    _libc = None
+
+try:
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_init1.argtypes = [ctypes.c_int]
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+except (OSError, AttributeError):
+    _inotify_init1 = None
+
+# renameat2(RENAME_EXCHANGE) for rep-mode replacement (Linux 3.15+, glibc 2.28+)
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 0x2
+
+try:
+    _renameat2 = _libc.renameat2
+    _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+except (OSError, AttributeError):
+    _renameat2 = None
+
+
+# Tuples written with a TTL by this process, removed by a lazily started
+# sweeper thread as they expire: heap of (expiry, filename)
+_expiry_heap: List[tuple[int, str]] = []
+_expiry_cond = threading.Condition()
+_sweeper: Optional[threading.Thread] = None
+
+# Trailing ".EXPIRY" of a tuple filename. Requires a plausible Unix timestamp
+# (10+ digits, >= year 2001) to avoid treating short numeric suffixes in
+# tuple names as expiry.
+_EXPIRY_RE = re.compile(r'.*\.([1-9][0-9]{9,})', re.DOTALL)
+
+_entry_name = operator.attrgetter('name')
+_group1 = operator.itemgetter(1)
+
+# First wildcard character of a glob
+_GLOB_META_RE = re.compile(r'[*?[]')
+
+# Storage modes as small ints: out() maps the mode string once at the API
+# boundary and everything below it branches on these
+_NORMAL, _SEQ, _REP = 0, 1, 2
+_MODES = {None: _NORMAL, "seq": _SEQ, "rep": _REP}
+
+# FIFO tuple filename: name-NNNNNNNN-XXXXXXXX[.EXPIRY]
+_SEQ_RE = re.compile(r'.*-[0-9]{8,}-[0-9a-f]+(?:\.[0-9]+)?', re.DOTALL)
 
 
 class TupleNotFound(Exception):
@@ -29,7 +106,16 @@ class LockTimeout(Exception):
 
 def _random_suffix(length: int = 8) -> str:
     """Generate random hex suffix for tuple filenames."""
-    return ''.join(random.choices('0123456789abcdef', k=length))
+    return os.urandom(length // 2).hex()
+
+
+def _now_s() -> int:
+    """Current Unix time in whole seconds, the clock of tuple expiries.
+    
+    Operations read it once and pass it down, so every expiry check within
+    one call agrees on the time.
+    """
+    return time.time_ns() // 1_000_000_000
 
 
 def _parse_filename(filename: str) -> tuple[str, int, str]:
@@ -42,80 +128,92 @@ def _parse_filename(filename: str) -> tuple[str, int, str]:
     - name-XXXXXXXX (no expiry)
     - name (replacement, no expiry)
     """
-    if '.' in filename:
-        base, expires_str = filename.rsplit('.', 1)
-        try:
-            expiry = int(expires_str)
-            # Require a plausible Unix timestamp (10+ digits, >= year 2001)
-            # to avoid treating short numeric suffixes in tuple names as expiry.
-            if expiry < 1_000_000_000:
-                base = filename
-                expiry = 0
-        except ValueError:
-            # Not a valid expiry, treat as part of name
-            base = filename
-            expiry = 0
+    m = _EXPIRY_RE.fullmatch(filename)
+    if m:
+        base = filename[:m.start(1) - 1]
+        expiry = int(m.group(1))
     else:
         base = filename
         expiry = 0
     
     # Extract the tuple name (everything before first hyphen, or the whole thing)
-    if '-' in base:
-        name = base.split('-')[0]
-    else:
-        name = base
+    name = base.partition('-')[0]
     
     return name, expiry, base
 
 
-def _is_expired(filepath: Path) -> bool:
-    """Check if a tuple file has expired."""
+def _unlink_quiet(path: str, dir_fd: Optional[int] = None) -> None:
+    """Remove a file, ignoring it already being gone."""
     try:
-        _, expiry, _ = _parse_filename(filepath.name)
-        return expiry != 0 and time.time() >= expiry
-    except ValueError:
+        os.unlink(path, dir_fd=dir_fd)
+    except FileNotFoundError:
+        pass
+
+
+def _lock_is_stale(lockfile: str) -> bool:
+    """Check whether a lock file was left behind by a dead process.
+    
+    An empty lock file is usually still being written by its owner and
+    counts as held, as in the Tcl implementation, but only for LOCK_TIMEOUT
+    seconds: an owner that died before writing its PID must not hold the
+    tuple forever. A PID owned by another user (EPERM) is alive.
+    """
+    try:
+        with open(lockfile, 'r') as f:
+            content = f.read().strip()
+        if not content:
+            return time.time() - os.stat(lockfile).st_mtime >= LOCK_TIMEOUT
+    except FileNotFoundError:
+        return False  # Released meanwhile, just retry the create
+    except OSError:
         return True
+    
+    try:
+        os.kill(int(content), 0)
+    except ValueError:
+        return True  # Corrupt lock file
+    except PermissionError:
+        return False  # Process exists but belongs to another user
+    except OSError:
+        return True  # Process is dead
+    return False
 
 
 @contextlib.contextmanager
-def _file_lock(filepath: Path, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
-    """Context manager for file locking using fcntl."""
-    lockfile = filepath.with_suffix(filepath.suffix + '.lock')
-    start_time = time.time()
+def _file_lock(filepath: str, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """Context manager for per-file PID locking (shared with shell and Tcl).
+    
+    A timeout of 0 makes a single non-blocking attempt (after stale lock
+    recovery), so callers with other candidates can move on immediately.
+    """
+    lockfile = f"{filepath}.lock"
+    deadline = None  # Set on first contention: uncontended locks read no clock
+    delay = 0.001  # Locks are held briefly: back off from 1ms up to 50ms
     
     while True:
         try:
             # Create lock file and acquire exclusive lock
-            fd = os.open(str(lockfile), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            fd = os.open(lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
             try:
                 os.write(fd, str(os.getpid()).encode())
             except Exception:
                 os.close(fd)
-                lockfile.unlink(missing_ok=True)
+                _unlink_quiet(lockfile)
                 raise
             break
         except FileExistsError:
-            # Check for stale locks and timeout
-            if time.time() - start_time > timeout:
+            if _lock_is_stale(lockfile):
+                _unlink_quiet(lockfile)
+                continue
+            
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + timeout
+            if now >= deadline:
                 raise LockTimeout(f"Failed to acquire lock for {filepath}")
             
-            # Check if lock is stale
-            try:
-                with open(lockfile, 'r') as f:
-                    pid = int(f.read().strip())
-                # Check if process is still running
-                try:
-                    os.kill(pid, 0)
-                except (OSError, ProcessLookupError):
-                    # Process is dead, remove stale lock
-                    lockfile.unlink(missing_ok=True)
-                    continue
-            except (FileNotFoundError, ValueError, OSError):
-                # Corrupt or missing lock file
-                lockfile.unlink(missing_ok=True)
-                continue
-                
-            time.sleep(0.05)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
         except FileNotFoundError:
             # Original file was deleted, can't lock
             raise TupleNotFound(f"Tuple file {filepath} not found")
@@ -124,65 +222,636 @@ def _file_lock(filepath: Path, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
         yield
     finally:
         os.close(fd)
-        lockfile.unlink(missing_ok=True)
+        _unlink_quiet(lockfile)
 
 
-def _next_seq(name: str) -> str:
-    """Generate next sequence number for FIFO semantics."""
-    seqfile = TUPLEDIR / f".{name}.seq"
+def _next_seq(name: str, count: int = 1) -> int:
+    """Reserve the next count sequence numbers for FIFO semantics, returning
+    the first.
+    """
+    seqfile = f"{_TUPLEDIR_STR}.{name}.seq"
     
     try:
         with _file_lock(seqfile):
-            seq = 0
-            if seqfile.exists():
+            # Read and rewrite the counter through one fd: open, read, pwrite, close
+            fd = os.open(seqfile, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            try:
+                current = os.read(fd, 64)
                 try:
-                    seq = int(seqfile.read_text().strip())
-                except (ValueError, FileNotFoundError):
+                    seq = int(current.strip())
+                except ValueError:
                     seq = 0
-            
-            seq += 1
-            seqfile.write_text(f"{seq:08d}")
-            return f"-{seq:08d}"
+                
+                encoded = f"{seq + count:08d}".encode()
+                os.pwrite(fd, encoded, 0)
+                if len(current) > len(encoded):
+                    os.ftruncate(fd, len(encoded))  # e.g. trailing newline from Tcl
+            finally:
+                os.close(fd)
+            return seq + 1
     except LockTimeout:
         raise LockTimeout(f"Failed to acquire sequence lock for {name}")
 
 
+def _search_pattern(pattern: str) -> str:
+    """Return the filename glob for a tuple name pattern."""
+    # Handle glob patterns - if pattern contains *, use it directly
+    if '*' in pattern or '?' in pattern:
+        return pattern
+    # Exact name match - look for files starting with name
+    return f"{pattern}*"
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> Optional[Callable[[str], object]]:
+    """Compile a tuple name pattern to a filename predicate (cached).
+    
+    Callers apply the predicate to whole name lists through filter(), so
+    rejecting non-matching names never enters the Python loop. A glob of
+    only *s (the default ls() pattern) matches every name and compiles to
+    None, which callers take as "no filtering".
+    """
+    search_pattern = _search_pattern(pattern)
+    if not search_pattern.strip('*'):
+        return None
+    return re.compile(fnmatch.translate(search_pattern)).match
+
+
+@functools.lru_cache(maxsize=256)
+def _literal_prefix(pattern: str) -> str:
+    """Return the literal start of a pattern's glob, up to its first wildcard
+    (cached).
+    """
+    search_pattern = _search_pattern(pattern)
+    wildcard = _GLOB_META_RE.search(search_pattern)
+    return search_pattern[:wildcard.start()] if wildcard else search_pattern
+
+
+@functools.lru_cache(maxsize=256)
+def _packed_prefix_re(prefix: str) -> re.Pattern:
+    """Compile a regex finding the names starting with prefix in a
+    NUL-separated name buffer (cached).
+    """
+    return re.compile(f"\0({re.escape(prefix)}[^\0]*)")
+
+
+def _scan_dir(pattern: Optional[str], complete: bool = False) -> Iterator[str]:
+    """Remove expired tuple files and find matching ones in a single pass.
+    
+    Entries that do not match the pattern are skipped without being checked
+    for expiry; a pattern of None checks every entry. A complete scan
+    removes expired files itself once the listing is done, unlinking a lock
+    file only where the listing showed one; a lookup leaves them to the
+    sweeper thread so inp/rd never wait on their unlinks.
+    
+    Args:
+        pattern: Tuple name pattern, or None to only remove expired tuples
+        complete: The caller will consume every match. The directory is then
+            read as a plain list of names, which is cheaper than DirEntry
+            objects; otherwise it is read lazily so lookups can stop early.
+    
+    Yields:
+        Filenames of non-expired tuples matching the pattern, in directory order
+    """
+    expiry_match = _EXPIRY_RE.fullmatch
+    now = _now_s()  # One clock read for the whole scan
+    
+    try:
+        if complete:
+            entries = None
+            names = os.listdir(_TUPLEDIR_STR)
+        else:
+            entries = os.scandir(_TUPLEDIR_STR)
+            names = map(_entry_name, entries)
+    except FileNotFoundError:
+        return  # LINDA_DIR was removed: there are no tuples
+    expired: List[str] = []
+    # Lock files seen by a complete scan. Usable only when every lock file
+    # of a matching tuple matches too, i.e. the glob ends with *
+    locks = None
+    if complete and (pattern is None or _search_pattern(pattern)[-1] == '*'):
+        locks = set()
+    if pattern is not None:
+        # Match every name in one C-level filter() pass with the compiled
+        # pattern; only candidates reach the Python loop below
+        match = _compile_pattern(pattern)
+        if match is not None:
+            names = filter(match, names)
+    
+    # Hot loop: slicing and match indexing avoid method calls per entry
+    try:
+        for filename in names:
+            if filename[0] == '.':
+                continue  # Skip hidden files like sequence files
+            if filename[-5:] == '.lock':
+                if locks is not None:
+                    locks.add(filename)
+                continue
+            
+            m = expiry_match(filename)
+            if m is not None and now >= int(m[1]):
+                expired.append(filename)
+            elif pattern is not None:
+                yield filename
+    finally:
+        if entries is not None:
+            entries.close()
+        if expired:
+            if complete:
+                for filename in expired:
+                    _remove_expired(f"{_TUPLEDIR_STR}{filename}",
+                                    has_lock=locks is None or f"{filename}.lock" in locks)
+            else:
+                _hand_off_expired(expired)
+
+
+def _remove_expired(path: str, dir_fd: Optional[int] = None, has_lock: bool = True) -> None:
+    """Remove an expired tuple file and any lock file left on it.
+    
+    With dir_fd, path is a filename relative to that directory descriptor.
+    has_lock=False skips the lock file unlink, for callers that know there
+    is none.
+    """
+    try:
+        os.unlink(path, dir_fd=dir_fd)
+        # Also remove any stale lock files
+        if has_lock:
+            os.unlink(f"{path}.lock", dir_fd=dir_fd)
+    except FileNotFoundError:
+        pass
+
+
+def _open_dir() -> int:
+    """Open TUPLEDIR for unlinking by relative name (*at calls)."""
+    return os.open(_TUPLEDIR_STR, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+
+
+def _schedule_expiry(expiry: int, filename: str) -> None:
+    """Queue a tuple written by this process for removal once it expires."""
+    with _expiry_cond:
+        heapq.heappush(_expiry_heap, (expiry, filename))
+        if _expiry_heap[0][0] == expiry:
+            _expiry_cond.notify()  # New earliest expiry, re-arm the sweeper
+        _start_sweeper()
+
+
+def _hand_off_expired(filenames: List[str]) -> None:
+    """Queue already expired tuple files (e.g. written by other processes)
+    for immediate removal by the sweeper, off the caller's lookup path.
+    """
+    with _expiry_cond:
+        for filename in filenames:
+            heapq.heappush(_expiry_heap, (0, filename))
+        _expiry_cond.notify()
+        _start_sweeper()
+
+
+def _start_sweeper() -> None:
+    """Start the sweeper thread on first use (_expiry_cond held)."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep_expired, name="linda-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def _sweep_expired() -> None:
+    """Sweeper thread body: sleep until the earliest queued expiry, then remove
+    every tuple that is due.
+    """
+    while True:
+        with _expiry_cond:
+            while True:
+                now = time.time()  # One clock read per wakeup
+                if _expiry_heap and _expiry_heap[0][0] <= now:
+                    break
+                _expiry_cond.wait(_expiry_heap[0][0] - now if _expiry_heap else None)
+            
+            due = []
+            while _expiry_heap and _expiry_heap[0][0] <= now:
+                due.append(heapq.heappop(_expiry_heap)[1])
+        
+        # One directory fd per batch; each unlink skips the full path walk
+        try:
+            dir_fd = _open_dir()
+        except OSError:
+            continue  # TUPLEDIR is gone, nothing left to remove
+        try:
+            for filename in due:
+                try:
+                    _remove_expired(filename, dir_fd)
+                except OSError:
+                    pass  # Not ours to remove (EACCES, EISDIR, EROFS); keep sweeping
+        finally:
+            os.close(dir_fd)
+
+
+def _reset_sweeper() -> None:
+    """Forget the parent's sweeper state in a forked child."""
+    global _expiry_cond, _sweeper
+    _expiry_heap.clear()
+    _expiry_cond = threading.Condition()
+    _sweeper = None
+
+
+os.register_at_fork(after_in_child=_reset_sweeper)
+
+
 def _cleanup_expired() -> None:
     """Remove all expired tuple files."""
-    current_time = time.time()
+    if _memory is not None:
+        _memory.cleanup_expired()
+        return
     
-    for filepath in TUPLEDIR.glob("*"):
-        if filepath.name.startswith('.'):
-            continue  # Skip hidden files like sequence files
-        
-        if _is_expired(filepath):
+    for _ in _scan_dir(None, complete=True):
+        pass
+
+
+def _find_matching_tuples(pattern: str) -> Iterator[str]:
+    """Yield paths of non-expired tuples matching the pattern, removing expired ones.
+    
+    Unordered tuples are yielded as soon as the scan finds them, so a caller
+    that stops at the first candidate does not read the rest of the
+    directory. Sequence-numbered tuples must come out in FIFO (filename)
+    order: they are held back and popped lazily from a heap once the scan
+    completes, instead of fully sorting every match.
+    """
+    sequenced = []
+    for filename in _scan_dir(pattern):
+        if _SEQ_RE.fullmatch(filename):
+            sequenced.append(filename)
+        else:
+            yield f"{_TUPLEDIR_STR}{filename}"
+    
+    heapq.heapify(sequenced)
+    while sequenced:
+        yield f"{_TUPLEDIR_STR}{heapq.heappop(sequenced)}"
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to fd."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _exchange(src: str, dst: str) -> bool:
+    """Atomically swap two paths, returning False if dst does not exist or
+    the filesystem cannot exchange.
+    """
+    global _renameat2
+    
+    if _renameat2 is None:
+        return False
+    if _renameat2(_AT_FDCWD, os.fsencode(src), _AT_FDCWD, os.fsencode(dst), _RENAME_EXCHANGE) == 0:
+        return True
+    
+    err = ctypes.get_errno()
+    if err in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+        _renameat2 = None  # Not supported here, stop trying
+    elif err != errno.ENOENT:
+        raise OSError(err, os.strerror(err), dst)
+    return False
+
+
+def _write_tuple(filepath: str, name: str, data: bytes, replace: bool = False) -> None:
+    """Atomically publish a tuple file.
+    
+    New tuples are written to an anonymous O_TMPFILE inode and linked into
+    place, so no temporary name is ever visible in TUPLEDIR. Replacements
+    (linkat cannot overwrite) and filesystems without O_TMPFILE write a
+    temporary file and rename it over the target. A replacement whose
+    target exists is exchanged with it instead, and the old tuple is then
+    unlinked: ext4 flushes the new file's data on a rename that overwrites
+    a file, which makes a plain rename several times slower.
+    """
+    global _use_tmpfile
+    
+    if _use_tmpfile and not replace:
+        try:
+            fd = os.open(_TUPLEDIR_STR, os.O_TMPFILE | os.O_WRONLY | os.O_CLOEXEC, 0o600)
             try:
-                filepath.unlink()
-                # Also remove any stale lock files
-                lockfile = filepath.with_suffix(filepath.suffix + '.lock')
-                lockfile.unlink(missing_ok=True)
-            except FileNotFoundError:
-                pass
+                _write_all(fd, data)
+                os.link(f"/proc/self/fd/{fd}", filepath)  # linkat(..., AT_SYMLINK_FOLLOW)
+            finally:
+                os.close(fd)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EISDIR, errno.EOPNOTSUPP, errno.EXDEV):
+                raise
+            _use_tmpfile = False  # Not supported here, stop trying
+    
+    tmp_path = f"{_TUPLEDIR_STR}tmp.{name}.{_random_suffix()}"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o600)
+    try:
+        try:
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        if replace and _exchange(tmp_path, filepath):
+            _unlink_quiet(tmp_path)  # Now holds the replaced tuple
+        else:
+            os.rename(tmp_path, filepath)
+    except BaseException:
+        _unlink_quiet(tmp_path)
+        raise
 
 
-def _find_matching_tuples(pattern: str) -> List[Path]:
-    """Find all non-expired tuples matching the pattern."""
-    matches = []
+class _NameSlot:
+    """Per-name state of the in-process backend, reached with one dict lookup."""
     
-    # Handle glob patterns - if pattern contains *, use it directly
-    if '*' in pattern or '?' in pattern:
-        search_pattern = pattern
-    else:
-        # Exact name match - look for files starting with name
-        search_pattern = f"{pattern}*"
+    __slots__ = ("queue", "count", "rep")
+    
+    def __init__(self) -> None:
+        self.queue: deque = deque()  # (id, data, expiry, rep) records, oldest first
+        self.count = 0  # Live records in the queue
+        self.rep: Optional[tuple] = None  # Current replacement record
+
+
+class _MemorySpace:
+    """In-process tuple space, selected with LINDA_BACKEND=mem.
+    
+    Same API semantics as the file backend (TTL, seq, rep, blocking),
+    without any filesystem syscalls. Tuples are visible only to threads of
+    this process: nothing is shared with other processes or the shell and
+    Tcl implementations.
+    
+    Patterns differ in one respect: they are matched against tuple names,
+    while the file backend matches them against whole filenames such as
+    job-XXXXXXXX. A glob without a trailing * therefore matches normal and
+    seq tuples here (rd("j?b") finds a tuple "job") but only rep tuples,
+    whose filename is the bare name, on the file backend.
+    
+    Each name maps to a _NameSlot holding a deque of (id, data, expiry, rep)
+    records in insertion order, which makes FIFO a popleft. Records leaving out of
+    order (replaced or expired) are only dropped from the stored-id set and
+    skipped once they reach the head, so every operation is O(1) amortized.
+    TTLs sit in a heap of (expiry, id, name, record), expired lazily at the
+    start of every operation. One lock guards all state; blocked readers
+    wait on a Condition over it, notified only when there are any.
+    """
     
-    for filepath in TUPLEDIR.glob(search_pattern):
-        if filepath.name.startswith('.'):
-            continue  # Skip hidden files
-        if not _is_expired(filepath):
-            matches.append(filepath)
+    def __init__(self) -> None:
+        # A plain Lock: its C-level context manager is cheaper than the
+        # Condition's; blocked readers wait on a Condition sharing it
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiters = 0
+        self._slots: dict[str, _NameSlot] = {}
+        # Names packed as "\0name\0name...\0" for prefix lookups, rebuilt on
+        # demand. Names added since then wait in _unpacked; removed names
+        # stay in the buffer (filtered out on lookup) until they pile up.
+        self._names_buf: Optional[str] = None
+        self._packed: set[str] = set()
+        self._unpacked: dict[str, None] = {}
+        self._stale = 0
+        self._stored: set[int] = set()  # Ids of live records
+        self._expiry_heap: List[tuple] = []
+        self._ids = itertools.count()
     
-    return sorted(matches)  # Consistent ordering for FIFO with sequences
+    def _expire(self, now: Optional[int] = None) -> None:
+        """Drop every tuple whose expiry has passed at now, read from the
+        clock only when needed (lock held).
+        """
+        heap = self._expiry_heap
+        if not heap:
+            return
+        if now is None:
+            now = _now_s()
+        while heap and heap[0][0] <= now:
+            _, _, name, record = heapq.heappop(heap)
+            self._discard(name, record)
+    
+    def _discard(self, name: str, record: tuple) -> None:
+        """Remove a record if it is still stored (lock held)."""
+        try:
+            self._stored.remove(record[0])
+        except KeyError:
+            return  # Already consumed or replaced
+        slot = self._slots[name]
+        if slot.rep is record:
+            slot.rep = None
+        slot.count -= 1
+        if not slot.count:
+            del self._slots[name]
+            if self._names_buf is not None:
+                if name in self._packed:
+                    self._stale += 1
+                    if self._stale > len(self._slots) + 64:
+                        self._names_buf = None
+                else:
+                    del self._unpacked[name]
+    
+    def _head(self, slot: _NameSlot) -> tuple:
+        """Return the oldest live record of a stored name (lock held)."""
+        queue = slot.queue
+        stored = self._stored
+        while queue[0][0] not in stored:
+            queue.popleft()  # Replaced or expired while queued
+        return queue[0]
+    
+    def _matching_names(self, pattern: str) -> Iterator[str]:
+        """Yield stored names matching the pattern (lock held).
+        
+        Iterates the name dict and buffer lazily: callers stop iterating
+        before they add or remove a name.
+        """
+        if pattern in self._slots:
+            yield pattern  # A bare name always matches itself
+        match = _compile_pattern(pattern)
+        prefix = _literal_prefix(pattern)
+        if prefix:
+            names = self._prefixed_names(prefix)
+        else:
+            names = self._slots
+        for name in names if match is None else filter(match, names):
+            if name != pattern:
+                yield name
+    
+    def _prefixed_names(self, prefix: str) -> Iterator[str]:
+        """Yield stored names starting with prefix, found by one regex search
+        over the packed name buffer instead of testing every name (lock held).
+        
+        Names containing NUL (impossible as tuple filenames) are only found
+        by their exact name.
+        """
+        buf = self._names_buf
+        if buf is None:
+            buf = self._names_buf = "\0" + "\0".join(self._slots) + "\0"
+            self._packed = set(self._slots)
+            self._unpacked.clear()
+            self._stale = 0
+        # Lazy and C-level end to end: search, group extraction, liveness
+        yield from filter(self._slots.__contains__, map(_group1, _packed_prefix_re(prefix).finditer(buf)))
+        for name in self._unpacked:
+            if name.startswith(prefix):
+                yield name
+    
+    def out(self, name: str, data: bytes, ttl: int, mode: int) -> None:
+        """Store a tuple from already validated arguments."""
+        now = _now_s() if ttl > 0 else None
+        with self._lock:
+            self._expire(now)
+            self._store(name, data, ttl, mode, now)
+            if self._waiters:
+                self._cond.notify_all()
+    
+    def out_many(self, records: List[tuple]) -> None:
+        """Store validated (name, data, ttl, mode) records under one lock."""
+        now = _now_s()
+        with self._lock:
+            self._expire(now)
+            for record in records:
+                self._store(*record, now)
+            if self._waiters:
+                self._cond.notify_all()
+    
+    def _store(self, name: str, data: bytes, ttl: int, mode: int, now: Optional[int]) -> None:
+        """Append one tuple to its name's queue (lock held; now is only
+        needed with a TTL).
+        """
+        expiry = now + ttl if ttl > 0 else 0
+        replace = mode == _REP
+        # Copy anything but exact bytes, so later changes to a caller's
+        # bytearray or memoryview cannot reach the stored tuple; bytes() of
+        # an empty payload is the b"" singleton
+        if type(data) is not bytes:
+            data = bytes(data)
+        record = (next(self._ids), data, expiry, replace)
+        
+        slot = self._slots.get(name)
+        if replace and slot is not None and slot.rep is not None:
+            # At most one replacement tuple per name
+            self._discard(name, slot.rep)
+            slot = self._slots.get(name)  # Dropped if that was its last tuple
+        if slot is None:
+            slot = self._slots[name] = _NameSlot()
+            if self._names_buf is not None and name not in self._packed:
+                self._unpacked[name] = None
+                if len(self._unpacked) > 64:
+                    self._names_buf = None
+        if replace:
+            slot.rep = record
+        queue = slot.queue
+        queue.append(record)
+        slot.count += 1
+        self._stored.add(record[0])
+        if len(queue) > 2 * slot.count + 8:
+            # Mostly dead records (e.g. a rep name nobody reads): compact
+            stored = self._stored
+            slot.queue = deque(r for r in queue if r[0] in stored)
+        if expiry:
+            heapq.heappush(self._expiry_heap, (expiry, record[0], name, record))
+    
+    def _take(self, pattern: str, consume: bool) -> Optional[bytes]:
+        """Return (and optionally remove) the oldest matching tuple, or None
+        (lock held, expired tuples already dropped).
+        """
+        for name in self._matching_names(pattern):
+            slot = self._slots[name]
+            record = self._head(slot)
+            if consume:
+                slot.queue.popleft()
+                self._discard(name, record)
+            return record[1]
+        return None
+    
+    def _peek(self, name: str) -> Optional[bytes]:
+        """Return the oldest tuple stored under exactly this name without
+        taking the lock, or None to fall back to the locked path.
+        
+        Each step is a single dict, deque or set read that is atomic on its
+        own, and the record is only returned if it is live at that moment: a
+        concurrent inp may consume it right after, which orders this rd
+        before it. Dead or expired heads are left to the locked path.
+        """
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        try:
+            record = slot.queue[0]
+        except IndexError:
+            return None
+        if record[0] not in self._stored or (record[2] and record[2] <= _now_s()):
+            return None
+        return record[1]
+    
+    def wait(self, pattern: str, consume: bool, timeout: Optional[float]) -> bytes:
+        """Take a matching tuple with the same timeout semantics as inp/rd."""
+        if not consume:
+            data = self._peek(pattern)  # Readers of a present name skip the lock
+            if data is not None:
+                return data
+        
+        with self._lock:
+            return self._wait_locked(pattern, consume, timeout)
+    
+    def exchange(self, name: str, data: bytes, pattern: str, timeout: Optional[float]) -> bytes:
+        """Store a normal tuple, then consume a tuple matching the pattern,
+        under one lock acquisition.
+        """
+        with self._lock:
+            self._expire()
+            self._store(name, data, 0, _NORMAL, None)
+            if self._waiters:
+                self._cond.notify_all()
+            return self._wait_locked(pattern, True, timeout)
+    
+    def _wait_locked(self, pattern: str, consume: bool, timeout: Optional[float]) -> bytes:
+        """Body of wait() (lock held, released only while blocked)."""
+        deadline = None
+        if timeout is not None and timeout >= 0:
+            deadline = time.monotonic() + timeout
+        
+        while True:
+            self._expire()
+            data = self._take(pattern, consume)
+            if data is not None:
+                return data
+            
+            if timeout == once:
+                raise TupleNotFound(f"No tuple matching '{pattern}'")
+            
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timeout waiting for tuple '{pattern}'")
+            self._waiters += 1
+            try:
+                self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+    
+    def take_many(self, patterns: List[str]) -> List[Optional[bytes]]:
+        """Consume one tuple per pattern under one lock (None where none)."""
+        with self._lock:
+            self._expire()
+            return [self._take(pattern, True) for pattern in patterns]
+    
+    def ls(self, pattern: str) -> List[str]:
+        """Return "count name" entries for names matching the pattern."""
+        with self._lock:
+            self._expire()
+            return sorted(f"{self._slots[name].count} {name}" for name in self._matching_names(pattern))
+    
+    def cleanup_expired(self) -> None:
+        """Drop every expired tuple."""
+        with self._lock:
+            self._expire()
+    
+    def clear(self) -> None:
+        """Remove all tuples."""
+        with self._lock:
+            self._slots.clear()
+            self._names_buf = None
+            self._stored.clear()
+            self._expiry_heap.clear()
+
+
+_backend = os.environ.get("LINDA_BACKEND", "fs")
+if _backend not in ("fs", "mem"):
+    raise ValueError(f"Invalid LINDA_BACKEND: {_backend}. Must be 'fs' or 'mem'")
+_memory: Optional[_MemorySpace] = _MemorySpace() if _backend == "mem" else None
 
 
 def out(name: str, data: Union[bytes, str], *args, ttl: int = 0, mode: Optional[str] = None) -> None:
@@ -205,8 +874,14 @@ def out(name: str, data: Union[bytes, str], *args, ttl: int = 0, mode: Optional[
         "seq": FIFO semantics with sequence numbering
         "rep": Replacement semantics (no random suffix, overwrites)
     """
-    _cleanup_expired()
-    
+    _out(*_parse_out(name, data, *args, ttl=ttl, mode=mode))
+
+
+def _parse_out(name: str, data: Union[bytes, str], *args, ttl: int = 0,
+               mode: Optional[str] = None) -> tuple[str, bytes, int, int]:
+    """Validate out() arguments, returning (name, data, ttl, mode) with data
+    encoded to bytes and mode mapped to _NORMAL, _SEQ or _REP.
+    """
     # Parse variable args (shell script style) - these override keyword args
     parsed_ttl = ttl
     parsed_mode = mode
@@ -214,7 +889,7 @@ def out(name: str, data: Union[bytes, str], *args, ttl: int = 0, mode: Optional[
     for arg in args:
         if isinstance(arg, int) and arg >= 0:
             parsed_ttl = arg
-        elif arg in ("seq", "rep"):
+        elif arg == "seq" or arg == "rep":
             if parsed_mode is not None:
                 raise ValueError(f"Mode already set to '{parsed_mode}', cannot also set '{arg}'")
             parsed_mode = arg
@@ -224,68 +899,178 @@ def out(name: str, data: Union[bytes, str], *args, ttl: int = 0, mode: Optional[
     if parsed_ttl < 0:
         raise ValueError("TTL must be non-negative")
     
-    if parsed_mode is not None and parsed_mode not in ("seq", "rep"):
-        raise ValueError(f"Invalid mode: {parsed_mode}. Must be 'seq' or 'rep'")
+    try:
+        mode_int = _MODES[parsed_mode]
+    except (KeyError, TypeError):
+        raise ValueError(f"Invalid mode: {parsed_mode}. Must be 'seq' or 'rep'") from None
     
     # Convert string to bytes if needed
     if isinstance(data, str):
         data = data.encode('utf-8')
     
-    # Build filename components
-    expiry = int(time.time()) + parsed_ttl if parsed_ttl > 0 else 0
+    return name, data, parsed_ttl, mode_int
+
+
+def out_many(items: Iterable[tuple]) -> None:
+    """Write a batch of tuples.
+    
+    Each item is a tuple of out() positional arguments: (name, data),
+    (name, data, ttl), (name, data, mode) or (name, data, ttl, mode). All
+    items are validated before any is written. Sequence numbers for each
+    "seq" name are reserved with one counter update, and waiters are woken
+    once for the whole batch.
     
-    # Sequence number for FIFO mode
-    seq_part = ""
-    if parsed_mode == "seq":
-        seq_part = _next_seq(name)
+    Args:
+        items: Iterable of out() argument tuples
+    """
+    records = [_parse_out(*item) for item in items]
+    if _memory is not None:
+        _memory.out_many(records)
+        return
+    
+    seqs: dict[str, int] = {}
+    for name, _, _, mode in records:
+        if mode == _SEQ:
+            seqs[name] = seqs.get(name, 0) + 1
+    for name, count in seqs.items():
+        seqs[name] = _next_seq(name, count)
+    
+    now = _now_s()
+    for name, data, ttl, mode in records:
+        seq = 0
+        if mode == _SEQ:
+            seq = seqs[name]
+            seqs[name] += 1
+        _write_record(name, data, now + ttl if ttl > 0 else 0, mode, seq)
+    
+    if records:
+        _notify_arrival()
+
+
+def out_bytes(name: str, data: bytes, ttl: int = 0) -> None:
+    """Write a normal (non-seq, non-rep) tuple of bytes.
+    
+    Fast path for bytes-only producers: skips out()'s argument parsing,
+    mode checks and str encoding.
+    
+    Args:
+        name: Tuple name
+        data: Tuple data (bytes)
+        ttl: Time to live in seconds (0 = no expiry)
+    """
+    if ttl < 0:
+        raise ValueError("TTL must be non-negative")
+    _out(name, data, ttl, _NORMAL)
+
+
+def _out(name: str, data: bytes, ttl: int, mode: int) -> None:
+    """Write a tuple from already validated arguments."""
+    if _memory is not None:
+        _memory.out(name, data, ttl, mode)
+        return
     
-    # Random suffix (unless replacement mode)
-    suffix_part = ""
-    if parsed_mode != "rep":
-        suffix_part = f"-{_random_suffix()}"
+    expiry = _now_s() + ttl if ttl > 0 else 0
+    _write_record(name, data, expiry, mode, _next_seq(name) if mode == _SEQ else 0)
+    _notify_arrival()
+
+
+def _write_record(name: str, data: bytes, expiry: int, mode: int, seq: int) -> None:
+    """Publish one tuple file (expiry 0 = none; seq is its reserved number in
+    _SEQ mode).
+    """
+    # Sequence number for FIFO mode
+    seq_part = f"-{seq:08d}" if mode == _SEQ else ""
     
     # Expiry part
     expiry_part = f".{expiry}" if expiry > 0 else ""
     
-    filename = f"{name}{seq_part}{suffix_part}{expiry_part}"
-    filepath = TUPLEDIR / filename
+    if mode == _REP:
+        filename = f"{name}{expiry_part}"
+        _write_tuple(f"{_TUPLEDIR_STR}{filename}", name, data, replace=True)
+    else:
+        while True:
+            # Random suffix; a clash with a live tuple is rare but makes
+            # the link fail with EEXIST, so draw a new one and retry
+            filename = f"{name}{seq_part}-{_random_suffix()}{expiry_part}"
+            try:
+                _write_tuple(f"{_TUPLEDIR_STR}{filename}", name, data)
+                break
+            except FileExistsError:
+                continue
+    
+    if expiry:
+        _schedule_expiry(expiry, filename)
+
+
+def _read_tuple(filepath: str) -> bytes:
+    """Read a whole tuple file using raw fd calls (no buffered file object).
+    
+    Tuple files are never modified after they are published, so a short
+    read is EOF: small tuples cost a single read, without the empty read
+    that would otherwise confirm EOF.
+    """
+    fd = os.open(filepath, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        data = os.read(fd, READ_CHUNK)
+        if len(data) < READ_CHUNK:
+            return data
+        
+        # Larger tuple: read the whole file straight into the result rather
+        # than joining chunks, which would copy the payload a second time
+        data = os.pread(fd, os.fstat(fd).st_size, 0)
+        os.lseek(fd, len(data), os.SEEK_SET)
+        chunks = [data]
+        while chunk := os.read(fd, READ_CHUNK):
+            chunks.append(chunk)  # Only for reads the kernel cut short
+    finally:
+        os.close(fd)
     
-    # Atomic write using temporary file
-    with tempfile.NamedTemporaryFile(
-        mode='wb',
-        dir=TUPLEDIR,
-        prefix=f"tmp.{name}.",
-        delete=False
-    ) as tmp_file:
-        tmp_file.write(data)
-        tmp_path = Path(tmp_file.name)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+def _read_tuple_into(filepath: str, buf: Union[bytearray, memoryview]) -> int:
+    """Read a whole tuple file into a writable buffer, returning its length.
     
-    tmp_path.rename(filepath)
+    A tuple larger than buf raises ValueError before anything is read, so
+    buf is left untouched as with the in-process backend.
+    """
+    fd = os.open(filepath, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        if os.fstat(fd).st_size > len(buf):
+            raise ValueError(f"Tuple {filepath} is larger than the {len(buf)} byte buffer")
+        n = os.readv(fd, [buf])
+    finally:
+        os.close(fd)
+    return n
+
 
+_R = TypeVar("_R")  # Result of the read callback of read-only lookups
 
-def _try_read_tuple_atomic(pattern: str, consume: bool) -> bytes:
+
+def _try_read_tuple_atomic(pattern: str, consume: bool,
+                           read: Callable[[str], _R] = _read_tuple) -> Union[bytes, _R]:
     """Try to atomically read (and optionally consume) a tuple matching the pattern.
     
     This function implements the same locking strategy as the shell and Tcl versions:
     - For consume operations: Use file locking for atomic read-and-delete
-    - For read-only operations: Simple read without locking
+    - For read-only operations: Simple read without locking, through read
+      (called with the tuple's path)
     - Retry up to 2 times to handle race conditions
     """
     retry_count = 0
     
     while retry_count < 2:
-        matches = _find_matching_tuples(pattern)
-        found_any = len(matches) > 0
+        found_any = False
         
-        for filepath in matches:
+        for filepath in _find_matching_tuples(pattern):
+            found_any = True
             if consume:
                 # For consume operations, use atomic read-and-delete with locking
                 try:
-                    with _file_lock(filepath, timeout=0.1):  # Short lock timeout for retry
-                        with open(filepath, 'rb') as f:
-                            data = f.read()
+                    with _file_lock(filepath, timeout=0):  # Held by another consumer: try next file
+                        data = _read_tuple(filepath)
                         # Successfully read, now delete
-                        filepath.unlink()
+                        os.unlink(filepath)
                         return data
                 except (FileNotFoundError, TupleNotFound, LockTimeout):
                     # Lock failed or file disappeared, try next file
@@ -293,8 +1078,7 @@ def _try_read_tuple_atomic(pattern: str, consume: bool) -> bytes:
             else:
                 # For read-only operations, simple read without locking
                 try:
-                    with open(filepath, 'rb') as f:
-                        return f.read()
+                    return read(filepath)
                 except FileNotFoundError:
                     # File disappeared, try next file
                     continue
@@ -309,28 +1093,131 @@ def _try_read_tuple_atomic(pattern: str, consume: bool) -> bytes:
     raise TupleNotFound(f"No tuple matching '{pattern}'")
 
 
-def _wait_for_tuple(pattern: str, consume: bool, timeout: Optional[float]) -> bytes:
-    """Wait for a tuple matching the pattern with optional timeout."""
+@contextlib.contextmanager
+def _dir_watch() -> Iterator[Optional[int]]:
+    """Context manager yielding an inotify fd that becomes readable when a
+    file is created in or renamed into TUPLEDIR, or None if inotify is
+    unavailable.
+    """
+    fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC) if _inotify_init1 else -1
+    if fd < 0:
+        yield None
+        return
+    
+    try:
+        wd = _inotify_add_watch(fd, _TUPLEDIR_BYTES, _IN_CREATE | _IN_MOVED_TO)
+        yield fd if wd >= 0 else None
+    finally:
+        os.close(fd)
+
+
+def _drain_watch(fd: int) -> bool:
+    """Discard all pending inotify events, returning True if there were any."""
+    drained = False
+    try:
+        while os.read(fd, 65536):
+            drained = True
+    except BlockingIOError:
+        pass
+    return drained
+
+
+def _notify_arrival() -> None:
+    """Wake waiters in this process that are polling without inotify.
+    
+    Writers skip the Condition unless a waiter is registered. A waiter
+    registers before its first scan, so a tuple published before that
+    registration is seen by the scan itself.
+    """
+    global _arrival_count
+    if not _arrival_waiters:
+        return
+    with _arrivals:
+        _arrival_count += 1
+        _arrivals.notify_all()
+
+
+def _reset_arrivals() -> None:
+    """Forget the parent's arrival state in a forked child, where another
+    thread may have held _arrivals at the fork."""
+    global _arrivals, _arrival_count, _arrival_waiters
+    _arrivals = threading.Condition()
+    _arrival_count = 0
+    _arrival_waiters = 0
+
+
+os.register_at_fork(after_in_child=_reset_arrivals)
+
+
+@contextlib.contextmanager
+def _arrival_wait(register: bool) -> Iterator[None]:
+    """Register a waiter for _notify_arrival() wakeups while it is blocked
+    (only when register is true, i.e. without inotify)."""
+    global _arrival_waiters
+    if not register:
+        yield
+        return
+    with _arrivals:
+        _arrival_waiters += 1
+    try:
+        yield
+    finally:
+        with _arrivals:
+            _arrival_waiters -= 1
+
+
+def _wait_for_tuple(pattern: str, consume: bool, timeout: Optional[float],
+                    read: Callable[[str], _R] = _read_tuple) -> Union[bytes, _R]:
+    """Wait for a tuple matching the pattern with optional timeout.
+    
+    Read-only lookups on the file backend return read(filepath).
+    """
+    if _memory is not None:
+        return _memory.wait(pattern, consume, timeout)
+    
     if timeout == once:
         # Non-blocking mode
-        return _try_read_tuple_atomic(pattern, consume)
+        return _try_read_tuple_atomic(pattern, consume, read)
     
-    # Blocking mode with optional timeout
-    start_time = time.time()
+    # Blocking mode with optional timeout, against the monotonic clock so
+    # wall clock adjustments cannot stretch or cut the wait
+    deadline = None
+    if timeout is not None and timeout >= 0:
+        deadline = time.monotonic() + timeout
     
-    while True:
-        try:
-            return _try_read_tuple_atomic(pattern, consume)
-        except TupleNotFound:
-            pass  # Continue waiting
-        
-        # Check timeout
-        if timeout is not None and timeout >= 0:
-            elapsed = time.time() - start_time
-            if elapsed >= timeout:
-                raise TimeoutError(f"Timeout waiting for tuple '{pattern}'")
+    # Watch is established before the first scan so no arrival is missed
+    with _dir_watch() as watch_fd, _arrival_wait(watch_fd is None):
+        if watch_fd is not None:
+            # poll(2) rather than select(2): no FD_SETSIZE limit on the fd
+            poller = select.poll()
+            poller.register(watch_fd, select.POLLIN)
         
-        time.sleep(0.1)
+        while True:
+            seen = _arrival_count
+            try:
+                return _try_read_tuple_atomic(pattern, consume, read)
+            except TupleNotFound:
+                pass  # Continue waiting
+            
+            wait = WATCH_RESCAN if watch_fd is not None else POLL_INTERVAL
+            
+            # Check timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timeout waiting for tuple '{pattern}'")
+                wait = min(wait, remaining)
+            
+            if watch_fd is None:
+                # Wake early for tuples written by this process; others are
+                # picked up by the next rescan
+                with _arrivals:
+                    if _arrival_count == seen:
+                        _arrivals.wait(wait)
+            elif not _drain_watch(watch_fd):
+                # Only block when nothing arrived during the last scan
+                if poller.poll(wait * 1000):
+                    _drain_watch(watch_fd)
 
 
 def inp(name_pattern: str, timeout: Optional[float] = None) -> bytes:
@@ -348,7 +1235,6 @@ def inp(name_pattern: str, timeout: Optional[float] = None) -> bytes:
         TupleNotFound: If no matching tuple (non-blocking mode)
         TimeoutError: If timeout exceeded
     """
-    _cleanup_expired()
     return _wait_for_tuple(name_pattern, consume=True, timeout=timeout)
 
 
@@ -366,10 +1252,95 @@ def rd(name_pattern: str, timeout: Optional[float] = None) -> bytes:
         TupleNotFound: If no matching tuple (non-blocking mode)
         TimeoutError: If timeout exceeded
     """
-    _cleanup_expired()
     return _wait_for_tuple(name_pattern, consume=False, timeout=timeout)
 
 
+def rd_into(name_pattern: str, buf: Union[bytearray, memoryview],
+            timeout: Optional[float] = once) -> int:
+    """Read (peek) a tuple into a caller-provided buffer without removing it.
+    
+    Lets tight read loops reuse one preallocated buffer instead of
+    allocating a bytes object per read.
+    
+    Args:
+        name_pattern: Pattern to match tuple names (supports * and ? wildcards)
+        buf: Writable buffer (bytearray, memoryview, ...) sized for the
+            largest expected tuple
+        timeout: None = block forever, once = non-blocking (default), positive = timeout in seconds
+    
+    Returns:
+        Number of bytes written to the start of buf
+        
+    Raises:
+        TupleNotFound: If no matching tuple (non-blocking mode)
+        TimeoutError: If timeout exceeded
+        ValueError: If the tuple does not fit in buf
+    """
+    buf = memoryview(buf).cast("B")  # Lengths below are in bytes
+    if _memory is None:
+        return _wait_for_tuple(name_pattern, False, timeout,
+                               functools.partial(_read_tuple_into, buf=buf))
+    
+    data = _memory.wait(name_pattern, False, timeout)
+    n = len(data)
+    if n > len(buf):
+        raise ValueError(f"Tuple matching '{name_pattern}' is larger than the {len(buf)} byte buffer")
+    buf[:n] = data
+    return n
+
+
+def inp_many(name_patterns: Iterable[str]) -> List[Optional[bytes]]:
+    """Consume one tuple for each pattern without blocking.
+    
+    Args:
+        name_patterns: Iterable of patterns (supports * and ? wildcards)
+    
+    Returns:
+        List with the data of each consumed tuple, in pattern order, or
+        None where no tuple matched
+    """
+    patterns = list(name_patterns)
+    if _memory is not None:
+        return _memory.take_many(patterns)
+    
+    results: List[Optional[bytes]] = []
+    for pattern in patterns:
+        try:
+            results.append(_try_read_tuple_atomic(pattern, consume=True))
+        except TupleNotFound:
+            results.append(None)
+    return results
+
+
+def exchange(out_name: str, out_data: Union[bytes, str], in_name_pattern: str,
+             timeout: Optional[float] = once) -> bytes:
+    """Write a tuple, then consume one matching another pattern.
+    
+    Fuses the out()-then-inp() step of request/reply pipelines into one
+    call; the in-process backend does both under a single lock
+    acquisition. The tuple is written even if nothing is consumed.
+    
+    Args:
+        out_name: Name of the tuple to write (normal mode, no TTL)
+        out_data: Tuple data (string or bytes)
+        in_name_pattern: Pattern of the tuple to consume (supports * and ? wildcards)
+        timeout: None = block forever, once = non-blocking (default), positive = timeout in seconds
+    
+    Returns:
+        Data of the consumed tuple as bytes
+        
+    Raises:
+        TupleNotFound: If no matching tuple (non-blocking mode)
+        TimeoutError: If timeout exceeded
+    """
+    name, data, _, _ = _parse_out(out_name, out_data)
+    if _memory is not None:
+        return _memory.exchange(name, data, in_name_pattern, timeout)
+    
+    _out(name, data, 0, _NORMAL)
+    return _wait_for_tuple(in_name_pattern, consume=True, timeout=timeout)
+
+
 def ls(pattern: str = "*") -> List[str]:
     """List all tuple names matching the pattern with counts.
     
@@ -379,18 +1350,16 @@ def ls(pattern: str = "*") -> List[str]:
     Returns:
         List of strings in format "count name" for each tuple name
     """
-    _cleanup_expired()
+    if _memory is not None:
+        return _memory.ls(pattern)
     
     name_counts = {}
-    for filepath in TUPLEDIR.glob(pattern + "*" if not ('*' in pattern or '?' in pattern) else pattern):
-        if filepath.name.startswith('.'):
-            continue  # Skip hidden files
-        if not _is_expired(filepath):
-            try:
-                name, _, _ = _parse_filename(filepath.name)
-                name_counts[name] = name_counts.get(name, 0) + 1
-            except ValueError:
-                continue
+    for filename in _scan_dir(pattern, complete=True):
+        try:
+            name, _, _ = _parse_filename(filename)
+            name_counts[name] = name_counts.get(name, 0) + 1
+        except ValueError:
+            continue
     
     # Format as "count name" and sort
     result = [f"{count} {name}" for name, count in name_counts.items()]
@@ -399,9 +1368,17 @@ def ls(pattern: str = "*") -> List[str]:
 
 def clear() -> None:
     """Remove all tuples from the tuple space."""
-    for filepath in TUPLEDIR.glob("*"):
-        try:
-            filepath.unlink()
-        except FileNotFoundError:
-            pass
+    if _memory is not None:
+        _memory.clear()
+        return
+    
+    try:
+        dir_fd = _open_dir()
+    except FileNotFoundError:
+        return  # LINDA_DIR was removed: nothing to clear
+    try:
+        for filename in os.listdir(dir_fd):
+            _unlink_quiet(filename, dir_fd)
+    finally:
+        os.close(dir_fd)
 
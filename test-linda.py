@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 
 import unittest
+import ctypes
+import errno
 import os
 import time
 import tempfile
 import shutil
+import signal
 import threading
+from unittest import mock
 from pathlib import Path
 
 # Set up test environment before importing linda
 test_dir = "/tmp/lindatest"
 os.environ["LINDA_DIR"] = test_dir
+os.environ["LINDA_BACKEND"] = "fs"
 
 # Now import linda
 import linda
@@ -97,6 +102,109 @@ class TestLinda(unittest.TestCase):
         with self.assertRaises(linda.TupleNotFound):
             linda.rd("tempkey", linda.once)
 
+    def test_sweeper_removes_expired_tuple(self):
+        """Test a TTL tuple written here is removed with no ls/inp/rd."""
+        linda.out("sweepme", "short-lived", 1)
+        time.sleep(2.5)
+        self.assertEqual(list(linda.TUPLEDIR.glob("sweepme*")), [])
+
+    def test_out_after_fork_with_arrivals_held(self):
+        """Test a forked child can out() while a parent thread held _arrivals."""
+        held = threading.Event()
+        release = threading.Event()
+        def hold():
+            with linda._arrivals:
+                held.set()
+                release.wait()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                signal.alarm(5)  # A hang kills the child instead of the suite
+                linda._arrival_waiters = 1  # Make out() notify
+                linda.out("forked", "child")
+                os._exit(0)
+            _, status = os.waitpid(pid, 0)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(linda.inp("forked", linda.once), b"child")
+
+    def test_missing_dir_has_no_tuples(self):
+        """Test lookups treat a removed LINDA_DIR as an empty tuple space."""
+        shutil.rmtree(test_dir)
+        try:
+            with self.assertRaises(linda.TupleNotFound):
+                linda.rd("gone", linda.once)
+            with self.assertRaises(linda.TupleNotFound):
+                linda.inp("gone", linda.once)
+            with self.assertRaises(TimeoutError):
+                linda.inp("gone", 0.3)
+            self.assertEqual(linda.ls(), [])
+            linda._cleanup_expired()
+            linda.clear()
+        finally:
+            os.mkdir(test_dir)
+
+    def test_sweeper_survives_unremovable_entry(self):
+        """Test an expired entry the sweeper cannot unlink does not stop it."""
+        stuck = linda.TUPLEDIR / "handoff-0123abcd.1000000000"
+        stuck.mkdir()  # unlink() fails with EISDIR
+        try:
+            with self.assertRaises(linda.TupleNotFound):
+                linda.rd("handoff", linda.once)  # Hands the entry to the sweeper
+            linda.out("handoff_after", "short-lived", 1)
+            time.sleep(2.5)
+            self.assertTrue(linda._sweeper.is_alive())
+            self.assertEqual(list(linda.TUPLEDIR.glob("handoff_after*")), [])
+        finally:
+            stuck.rmdir()
+
+    def test_out_retries_suffix_clash(self):
+        """Test out() draws a new suffix when the tuple file already exists."""
+        write_tuple = linda._write_tuple
+        paths = []
+        def clash_once(filepath, *args, **kwargs):
+            paths.append(filepath)
+            if len(paths) == 1:
+                raise FileExistsError(filepath)
+            write_tuple(filepath, *args, **kwargs)
+        with mock.patch.object(linda, "_write_tuple", side_effect=clash_once):
+            linda.out("clash", "data")
+        self.assertEqual(len(paths), 2)
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertEqual(linda.inp("clash", linda.once), b"data")
+
+    @unittest.skipIf(linda._renameat2 is None, "renameat2 unavailable")
+    def test_replacement_leaves_only_target(self):
+        """Test a rep overwrite is exchanged into place, leaving no temp file."""
+        exchange = linda._exchange
+        results = []
+        def recording_exchange(src, dst):
+            results.append(exchange(src, dst))
+            return results[-1]
+        linda.out("reptwo", "old", mode="rep")
+        with mock.patch.object(linda, "_exchange", side_effect=recording_exchange):
+            linda.out("reptwo", "new", mode="rep")
+        self.assertEqual(results, [True])
+        self.assertEqual(os.listdir(test_dir), ["reptwo"])
+        self.assertEqual((linda.TUPLEDIR / "reptwo").read_bytes(), b"new")
+
+    def test_replacement_without_exchange_support(self):
+        """Test EINVAL from renameat2 disables exchange and falls back to rename."""
+        def unsupported(*args):
+            ctypes.set_errno(errno.EINVAL)
+            return -1
+        linda.out("repfall", "old", mode="rep")
+        with mock.patch.object(linda, "_renameat2", unsupported):
+            linda.out("repfall", "new", mode="rep")
+            self.assertIsNone(linda._renameat2)
+        self.assertEqual(os.listdir(test_dir), ["repfall"])
+        self.assertEqual((linda.TUPLEDIR / "repfall").read_bytes(), b"new")
+
     def test_replacement_semantics(self):
         """Test replacement semantics with rep mode."""
         linda.out("reptest", "first", mode="rep")
@@ -142,6 +250,27 @@ class TestLinda(unittest.TestCase):
         self.assertGreaterEqual(elapsed, 1.0)
         self.assertLessEqual(elapsed, 2.0)
 
+    @unittest.skipIf(linda._inotify_init1 is None, "inotify unavailable")
+    def test_blocking_inp_wakes_on_out(self):
+        """Test a blocked inp wakes on inotify well before the next rescan."""
+        timer = threading.Timer(0.2, linda.out, ("fswait", "arrived"))
+        timer.start()
+        start = time.monotonic()
+        self.assertEqual(linda.inp("fswait", 2), b"arrived")
+        self.assertLess(time.monotonic() - start, 0.2 + linda.WATCH_RESCAN / 2)
+        timer.join()
+
+    def test_blocking_inp_wakes_on_local_out_without_inotify(self):
+        """Test a polling inp is woken by an out() from this process."""
+        timer = threading.Timer(0.2, linda.out, ("pollwait", "arrived"))
+        with mock.patch.object(linda, "_inotify_init1", None), \
+             mock.patch.object(linda, "POLL_INTERVAL", 1.0):
+            timer.start()
+            start = time.monotonic()
+            self.assertEqual(linda.inp("pollwait", 2), b"arrived")
+            self.assertLess(time.monotonic() - start, 0.2 + linda.POLL_INTERVAL / 2)
+        timer.join()
+
     def test_clear_command(self):
         """Test clear command removes all tuples."""
         linda.out("cleartest1", "test1")
@@ -197,6 +326,29 @@ class TestLinda(unittest.TestCase):
         self.assertEqual(len(result), 10000)
         self.assertEqual(result, large_data.encode('utf-8'))
 
+    def test_rd_into(self):
+        """Test rd_into fills a caller buffer without consuming the tuple."""
+        buf = bytearray(16)
+        linda.out("intobuf", b"\x00payload")
+        self.assertEqual(linda.rd_into("intobuf", buf), 8)
+        self.assertEqual(bytes(buf[:8]), b"\x00payload")
+        self.assertEqual(linda.rd("intobuf", linda.once), b"\x00payload")
+        small = bytearray(b"ABCD")
+        with self.assertRaises(ValueError):
+            linda.rd_into("intobuf", small)
+        self.assertEqual(small, b"ABCD")  # Left untouched
+        with self.assertRaises(linda.TupleNotFound):
+            linda.rd_into("intonone", buf)
+
+    def test_exchange(self):
+        """Test exchange writes its tuple and consumes the reply."""
+        linda.out("xreply", "pong")
+        self.assertEqual(linda.exchange("xrequest", "ping", "xreply"), b"pong")
+        self.assertEqual(linda.inp("xrequest", linda.once), b"ping")
+        with self.assertRaises(linda.TupleNotFound):
+            linda.exchange("xrequest", "again", "xreply")
+        self.assertEqual(linda.inp("xrequest", linda.once), b"again")
+
     def test_multiple_operations(self):
         """Test multiple concurrent operations."""
         linda.clear()
@@ -215,6 +367,19 @@ class TestLinda(unittest.TestCase):
         
         self.assertEqual(count, 10)
 
+    def test_batch_operations(self):
+        """Test out_many/inp_many, including seq ordering within a batch."""
+        linda.clear()
+        linda.out_many([("batchq", "first", "seq"), ("batchq", "second", "seq"),
+                        ("batchx", b"bytes", 60), ("batchq", "third", 60, "seq")])
+        self.assertEqual(linda.ls("batch*"), ["1 batchx", "3 batchq"])
+        self.assertEqual(linda.inp_many(["batchq", "batchq", "batchx", "batchnone"]),
+                         [b"first", b"second", b"bytes", None])
+        self.assertEqual(linda.inp("batchq", linda.once), b"third")
+        with self.assertRaises(ValueError):
+            linda.out_many([("batchok", "data"), ("batchbad", "data", "bogus")])
+        self.assertEqual(linda.ls("batchok"), [])
+
     def test_ls_with_pattern(self):
         """Test ls command with pattern matching."""
         linda.clear()
@@ -237,6 +402,15 @@ class TestLinda(unittest.TestCase):
         result = linda.inp("bytes_test", linda.once)
         self.assertEqual(result, b"hello bytes")
 
+    def test_out_bytes(self):
+        """Test the bytes-only out fast path."""
+        linda.out_bytes("fast", b"payload")
+        linda.out_bytes("ttlfast", b"expiring", 5)
+        self.assertEqual(linda.inp("fast", linda.once), b"payload")
+        self.assertEqual(linda.inp("ttlfast", linda.once), b"expiring")
+        with self.assertRaises(ValueError):
+            linda.out_bytes("fast", b"data", -1)
+
     def test_invalid_arguments(self):
         """Test error handling for invalid arguments."""
         # Negative TTL should raise ValueError
@@ -391,6 +565,29 @@ class TestLinda(unittest.TestCase):
         self.assertEqual(result, b"data")
         self.assertFalse(lockfile.exists())
 
+    def test_empty_lock_held_only_while_young(self):
+        """An empty lock file counts as held until it is LOCK_TIMEOUT old."""
+        linda.out("empty_lock", "data")
+        filepath = next(linda.TUPLEDIR.glob("empty_lock*"))
+        lockfile = filepath.with_suffix(filepath.suffix + '.lock')
+        lockfile.write_text("")
+        with self.assertRaises(linda.TupleNotFound):
+            linda.inp("empty_lock", linda.once)
+        old = time.time() - linda.LOCK_TIMEOUT - 1
+        os.utime(lockfile, (old, old))
+        self.assertEqual(linda.inp("empty_lock", linda.once), b"data")
+        self.assertFalse(lockfile.exists())
+
+    def test_lock_of_other_users_process_is_held(self):
+        """A lock whose PID gives EPERM belongs to a live process."""
+        lockfile = linda.TUPLEDIR / "eperm.lock"
+        lockfile.write_text("1")
+        with mock.patch.object(linda.os, "kill", side_effect=PermissionError):
+            self.assertFalse(linda._lock_is_stale(str(lockfile)))
+        with mock.patch.object(linda.os, "kill", side_effect=ProcessLookupError):
+            self.assertTrue(linda._lock_is_stale(str(lockfile)))
+        lockfile.unlink()
+
     # === Gap 6: Conflicting modes seq + rep raise ValueError ===
 
     def test_conflicting_modes_seq_and_rep_raises(self):
@@ -444,11 +641,127 @@ class TestLinda(unittest.TestCase):
         self.assertIn(result, [b"normal", b"replacement"])
 
 
+class TestLindaMemory(unittest.TestCase):
+    """Test suite for the in-process backend (LINDA_BACKEND=mem)."""
+
+    def setUp(self):
+        """Route the public API to a fresh in-memory space."""
+        self.saved_memory = linda._memory
+        linda._memory = linda._MemorySpace()
+
+    def tearDown(self):
+        """Restore the backend selected at import."""
+        linda._memory = self.saved_memory
+
+    def test_basic_out_inp(self):
+        """Test out/rd/inp round trip without touching LINDA_DIR."""
+        linda.out("memtest", "hello")
+        self.assertEqual(list(linda.TUPLEDIR.glob("memtest*")), [])
+        self.assertEqual(linda.rd("memtest", linda.once), b"hello")
+        self.assertEqual(linda.inp("memtest", linda.once), b"hello")
+        with self.assertRaises(linda.TupleNotFound):
+            linda.inp("memtest", linda.once)
+
+    def test_fifo_and_replacement(self):
+        """Test seq mode order and rep mode overwrite."""
+        for item in ("first", "second", "third"):
+            linda.out("memfifo", item, mode="seq")
+        linda.out("memrep", "v1", mode="rep")
+        linda.out("memrep", "v2", mode="rep")
+        self.assertEqual([linda.inp("memfifo", linda.once) for _ in range(3)],
+                         [b"first", b"second", b"third"])
+        self.assertEqual(linda.ls("memrep"), ["1 memrep"])
+        self.assertEqual(linda.inp("memrep", linda.once), b"v2")
+
+    def test_replacement_keeps_queue_order(self):
+        """Test replacing a queued rep tuple leaves the other tuples in order."""
+        linda.out("memmix", "a", mode="seq")
+        linda.out("memmix", "r1", mode="rep")
+        linda.out("memmix", "b", mode="seq")
+        linda.out("memmix", "r2", mode="rep")
+        self.assertEqual(linda.ls("memmix"), ["3 memmix"])
+        self.assertEqual([linda.inp("memmix", linda.once) for _ in range(3)],
+                         [b"a", b"b", b"r2"])
+        self.assertEqual(linda.ls("memmix"), [])
+
+    def test_out_copies_buffer(self):
+        """Test a mutable payload is copied to bytes at out()."""
+        buf = bytearray(b"abc")
+        linda.out("memcopy", buf)
+        buf[0] = ord("Z")
+        data = linda.rd("memcopy", linda.once)
+        self.assertIs(type(data), bytes)
+        self.assertEqual(data, b"abc")
+
+    def test_batch_operations(self):
+        """Test out_many/inp_many round trip in insertion order."""
+        linda.out_many([("membatch", "a", "seq"), ("membatch", "b", "seq"), ("memother", "c")])
+        self.assertEqual(linda.inp_many(["membatch", "memother", "membatch", "memother"]),
+                         [b"a", b"c", b"b", None])
+
+    def test_rd_into(self):
+        """Test rd_into copies into a memoryview slice."""
+        buf = bytearray(8)
+        linda.out("meminto", "abc")
+        self.assertEqual(linda.rd_into("meminto", memoryview(buf)[2:]), 3)
+        self.assertEqual(bytes(buf), b"\x00\x00abc\x00\x00\x00")
+        small = bytearray(b"AB")
+        with self.assertRaises(ValueError):
+            linda.rd_into("meminto", small)
+        self.assertEqual(small, b"AB")
+
+    def test_exchange_blocks_for_reply(self):
+        """Test exchange hands off a request and waits for the worker's reply."""
+        def worker():
+            request = linda.inp("memrequest", 2)
+            linda.out("memreply", request.upper())
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertEqual(linda.exchange("memrequest", "job", "memreply", 2), b"JOB")
+        thread.join()
+
+    def test_tuple_expiry(self):
+        """Test tuples disappear after their TTL."""
+        linda.out("memexpire", "short-lived", 1)
+        time.sleep(2)
+        with self.assertRaises(linda.TupleNotFound):
+            linda.rd("memexpire", linda.once)
+        self.assertEqual(linda.ls(), [])
+
+    def test_pattern_matching_and_ls(self):
+        """Test wildcard lookups and ls counts."""
+        linda.out("prefix1", "data1")
+        linda.out("prefix2", "data2")
+        linda.out("prefix2", "data3")
+        linda.out("other", "data4")
+        self.assertIn(linda.rd("prefix*", linda.once), [b"data1", b"data2"])
+        self.assertEqual(linda.ls("prefix*"), ["1 prefix1", "2 prefix2"])
+
+    def test_blocking_inp_wakes_on_out(self):
+        """Test a blocked inp returns as soon as another thread writes."""
+        timer = threading.Timer(0.1, linda.out, ("memwait", "arrived"))
+        timer.start()
+        start = time.time()
+        self.assertEqual(linda.inp("memwait", 2), b"arrived")
+        self.assertLess(time.time() - start, 1.0)
+        timer.join()
+
+    def test_blocking_timeout(self):
+        """Test timeout and timeout=0 raise TimeoutError."""
+        with self.assertRaises(TimeoutError):
+            linda.inp("memabsent", 0)
+        start = time.time()
+        with self.assertRaises(TimeoutError):
+            linda.rd("memabsent", 0.5)
+        self.assertGreaterEqual(time.time() - start, 0.5)
+
+
 def run_tests():
     """Run all tests with verbose output."""
     # Create a test suite
     loader = unittest.TestLoader()
     suite = loader.loadTestsFromTestCase(TestLinda)
+    suite.addTests(loader.loadTestsFromTestCase(TestLindaMemory))
     
     # Run tests with verbose output
     runner = unittest.TextTestRunner(verbosity=2, buffer=True)